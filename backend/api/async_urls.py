@@ -0,0 +1,22 @@
+from django.urls import path
+
+from .async_views import async_view
+from .views import FollowViewSet, IngredientViewSet, RecipeViewSet, TagViewSet
+
+app_name = 'async_api'
+
+urlpatterns = [
+    path('recipes/', async_view(
+        RecipeViewSet, {'get': 'list', 'post': 'create'},
+        prefetch_membership=True)),
+    path('recipes/<int:pk>/', async_view(
+        RecipeViewSet,
+        {'get': 'retrieve', 'patch': 'partial_update', 'delete': 'destroy'},
+        prefetch_membership=True)),
+    path('ingredients/', async_view(IngredientViewSet, {'get': 'list'})),
+    path('ingredients/<int:pk>/', async_view(
+        IngredientViewSet, {'get': 'retrieve'})),
+    path('tags/', async_view(TagViewSet, {'get': 'list'})),
+    path('tags/<int:pk>/', async_view(TagViewSet, {'get': 'retrieve'})),
+    path('users/subscriptions/', async_view(FollowViewSet, {'get': 'list'})),
+]
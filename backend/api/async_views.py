@@ -0,0 +1,95 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import APIException
+
+from .membership import MEMBERSHIP_SOURCES, MEMBERSHIP_TIMEOUT, UserMembership
+
+view_executor = ThreadPoolExecutor(
+    settings.ASYNC_VIEW_THREADS, thread_name_prefix='async-view')
+membership_executor = ThreadPoolExecutor(
+    settings.ASYNC_MEMBERSHIP_THREADS, thread_name_prefix='async-membership')
+
+
+def run_in_thread(executor, func, *args, **kwargs):
+    def call():
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(call, thread_sensitive=False, executor=executor)()
+
+
+class PreauthenticatedTokenAuthentication(TokenAuthentication):
+
+    def authenticate(self, request):
+        credentials = getattr(request, 'token_credentials', None)
+        if credentials is not None:
+            return credentials
+        return super().authenticate(request)
+
+
+def authenticate(request):
+    try:
+        return TokenAuthentication().authenticate(request)
+    except APIException:
+        return None
+
+
+def get_cached_membership(membership):
+    key = membership.get_cache_key()
+    return key, cache.get(key)
+
+
+async def load_membership(membership):
+    data = None
+    try:
+        key, data = await run_in_thread(
+            membership_executor, get_cached_membership, membership)
+        if data is None:
+            values = await asyncio.gather(*(
+                run_in_thread(membership_executor, membership.fetch, name)
+                for name in MEMBERSHIP_SOURCES))
+            data = dict(zip(MEMBERSHIP_SOURCES, values))
+            await run_in_thread(membership_executor, cache.set, key, data,
+                                MEMBERSHIP_TIMEOUT)
+    finally:
+        membership.finish_load(data)
+
+
+def async_view(viewset, actions, prefetch_membership=False):
+    view = viewset.as_view(
+        actions, authentication_classes=[PreauthenticatedTokenAuthentication])
+
+    def dispatch(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if not getattr(response, 'is_rendered', True):
+            response.render()
+        return response
+
+    async def async_dispatch(request, *args, **kwargs):
+        credentials = await run_in_thread(
+            membership_executor, authenticate, request)
+        if credentials is None:
+            return await run_in_thread(
+                view_executor, dispatch, request, *args, **kwargs)
+        request.token_credentials = credentials
+        if not prefetch_membership:
+            return await run_in_thread(
+                view_executor, dispatch, request, *args, **kwargs)
+        membership = request.membership = UserMembership(credentials[0])
+        membership.begin_load()
+        response, _ = await asyncio.gather(
+            run_in_thread(view_executor, dispatch, request, *args, **kwargs),
+            load_membership(membership), return_exceptions=True)
+        if isinstance(response, BaseException):
+            raise response
+        return response
+
+    async_dispatch.csrf_exempt = True
+    return async_dispatch
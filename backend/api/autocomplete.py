@@ -0,0 +1,61 @@
+import time
+from bisect import bisect_left
+from threading import Lock
+
+from recipes.models import Ingredient
+
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+AUTOCOMPLETE_TTL = 300
+
+
+class IngredientPrefixIndex:
+
+    def __init__(self, ttl=AUTOCOMPLETE_TTL):
+        self.ttl = ttl
+        self._lock = Lock()
+        self._keys = None
+        self._entries = None
+        self._built_at = 0
+
+    def invalidate(self):
+        with self._lock:
+            self._keys = None
+            self._entries = None
+
+    def _load(self):
+        with self._lock:
+            if (self._entries is None
+                    or time.monotonic() - self._built_at > self.ttl):
+                rows = sorted(
+                    Ingredient.objects.values_list(
+                        'id', 'name', 'measurement_unit'),
+                    key=lambda row: (row[1].casefold(), row[0])
+                )
+                self._keys = [row[1].casefold() for row in rows]
+                self._entries = [
+                    {'id': id, 'name': name, 'measurement_unit': unit}
+                    for id, name, unit in rows
+                ]
+                self._built_at = time.monotonic()
+            return self._keys, self._entries
+
+    def search(self, query, limit=AUTOCOMPLETE_LIMIT):
+        keys, entries = self._load()
+        query = query.casefold()
+        result = []
+        index = bisect_left(keys, query)
+        while (index < len(keys) and len(result) < limit
+               and keys[index].startswith(query)):
+            result.append(entries[index])
+            index += 1
+        if len(result) < limit:
+            for key, entry in zip(keys, entries):
+                if query in key and not key.startswith(query):
+                    result.append(entry)
+                    if len(result) == limit:
+                        break
+        return result
+
+
+ingredient_index = IngredientPrefixIndex()
@@ -0,0 +1,207 @@
+import hashlib
+import time
+from functools import partial
+
+from django.core.cache import cache
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+
+from .renderers import FastJSONRenderer
+
+
+def get_version_key(model):
+    return f'{model._meta.label_lower}:version'
+
+
+def get_cache_version(model):
+    return cache.get_or_set(get_version_key(model), time.time, None)
+
+
+def bump_cache_version(model):
+    cache.set(get_version_key(model), time.time(), None)
+
+
+def get_cache_versions(models):
+    keys = [get_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    missing = {key: time.time() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def get_stats_key(prefix, hit):
+    return f'{prefix}:{"hits" if hit else "misses"}'
+
+
+def record_cache_access(prefix, hit):
+    key = get_stats_key(prefix, hit)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def get_cache_stats(prefix):
+    hits_key, misses_key = get_stats_key(prefix, True), get_stats_key(
+        prefix, False)
+    counters = cache.get_many([hits_key, misses_key])
+    hits = counters.get(hits_key, 0)
+    misses = counters.get(misses_key, 0)
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / (hits + misses), 4) if hits else 0.0,
+    }
+
+
+class CachedReadOnlyMixin:
+    cache_timeout = 3600
+
+    def get_cached_response(self, request, build_response):
+        model = self.get_queryset().model
+        version = get_cache_version(model)
+        path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        key = f'{model._meta.label_lower}:{version}:{path}'
+        cached = cache.get(key)
+        if cached is None:
+            content = FastJSONRenderer().render(build_response().data)
+            etag = f'"{hashlib.md5(content).hexdigest()}"'
+            cached = (content, etag)
+            cache.set(key, cached, self.cache_timeout)
+        content, etag = cached
+        last_modified = int(version)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = HttpResponse(content, content_type='application/json')
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            request, partial(super().list, request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            request, partial(super().retrieve, request, *args, **kwargs))
+
+
+class AnonymousResponseCacheMixin:
+    response_cache_prefix = None
+    response_cache_models = ()
+    response_cache_params = ()
+    response_cache_timeout = 3600
+
+    def get_response_cache_key(self, request):
+        if not request.user.is_anonymous:
+            return None
+        params = request.query_params
+        if not set(params) <= set(self.response_cache_params):
+            return None
+        normalized = '&'.join(
+            f'{name}={",".join(sorted(set(params.getlist(name))))}'
+            for name in self.response_cache_params if name in params
+        )
+        versions = ':'.join(
+            str(version) for version in get_cache_versions(
+                self.response_cache_models))
+        lookup = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        path = hashlib.md5(
+            f'{request.get_host()}|{self.action}|{lookup}|{normalized}'
+            .encode()).hexdigest()
+        return f'{self.response_cache_prefix}:{versions}:{path}'
+
+    def get_anonymous_response(self, request, build_response):
+        key = self.get_response_cache_key(request)
+        if key is None:
+            return build_response()
+        content = cache.get(key)
+        record_cache_access(self.response_cache_prefix, content is not None)
+        if content is None:
+            content = FastJSONRenderer().render(build_response().data)
+            cache.set(key, content, self.response_cache_timeout)
+            state = 'MISS'
+        else:
+            state = 'HIT'
+        response = HttpResponse(content, content_type='application/json')
+        response['X-Cache'] = state
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_anonymous_response(
+            request, partial(super().list, request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_anonymous_response(
+            request, partial(super().retrieve, request, *args, **kwargs))
+
+
+class SharedPayloadMixin:
+    payload_cache_prefix = None
+    payload_cache_models = ()
+    payload_version_field = 'updated_at'
+    payload_cache_timeout = 3600
+    payload_builder = None
+
+    def use_shared_payloads(self):
+        return True
+
+    def get_payload_queryset(self):
+        return self.get_queryset()
+
+    def apply_overlay(self, payloads):
+        return payloads
+
+    def get_shared_payloads(self, rows):
+        versions = ':'.join(
+            str(version) for version in get_cache_versions(
+                self.payload_cache_models))
+        host = self.request.get_host()
+        keys = [
+            f'{self.payload_cache_prefix}:{versions}:{host}:{pk}:'
+            f'{updated.timestamp()}'
+            for pk, updated in rows
+        ]
+        payloads = cache.get_many(keys)
+        missing = {pk: key for (pk, _), key in zip(rows, keys)
+                   if key not in payloads}
+        if missing:
+            built = self.payload_builder(list(missing), self.request)
+            fresh = {key: built[pk] for pk, key in missing.items()
+                     if pk in built}
+            cache.set_many(fresh, self.payload_cache_timeout)
+            payloads.update(fresh)
+        return [payloads[key] for key in keys if key in payloads]
+
+    def get_payload_rows(self, queryset):
+        return queryset.values_list('pk', self.payload_version_field)
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_shared_payloads():
+            return super().list(request, *args, **kwargs)
+        rows = self.get_payload_rows(
+            self.filter_queryset(self.get_payload_queryset()))
+        page = self.paginate_queryset(rows)
+        data = self.apply_overlay(self.get_shared_payloads(
+            list(rows) if page is None else page))
+        if page is None:
+            return Response(data)
+        return self.get_paginated_response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.use_shared_payloads():
+            return super().retrieve(request, *args, **kwargs)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(
+            self.get_payload_rows(self.get_payload_queryset()),
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        payloads = self.get_shared_payloads([row])
+        if not payloads:
+            raise Http404
+        return Response(self.apply_overlay(payloads)[0])
@@ -0,0 +1,70 @@
+from collections import defaultdict
+
+from rest_framework.fields import DateTimeField
+from rest_framework.response import Response
+
+from recipes.models import Recipe, RecipeIngredient, RecipeTag
+
+TAG_FIELDS = ('id', 'name', 'color', 'slug')
+INGREDIENT_FIELDS = ('id', 'name', 'measurement_unit')
+AUTHOR_FIELDS = ('email', 'id', 'username', 'first_name', 'last_name')
+IMAGE_FIELDS = ('image', 'image_thumb', 'image_detail')
+
+pub_date_field = DateTimeField()
+
+
+def get_image_url(name, request):
+    if not name:
+        return None
+    url = Recipe._meta.get_field('image').storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def serialize_recipes(ids, request=None):
+    tags = defaultdict(list)
+    for row in RecipeTag.objects.filter(recipe_id__in=ids).order_by(
+            'tag__name').values_list(
+            'recipe_id', *(f'tag__{field}' for field in TAG_FIELDS)):
+        tags[row[0]].append(dict(zip(TAG_FIELDS, row[1:])))
+    ingredients = defaultdict(list)
+    for recipe_id, pk, name, unit, amount in RecipeIngredient.objects.filter(
+            recipe_id__in=ids).order_by('-id').values_list(
+            'recipe_id', 'ingredient_id', 'ingredient__name',
+            'ingredient__measurement_unit', 'amount'):
+        ingredients[recipe_id].append({
+            'id': pk, 'name': name, 'measurement_unit': unit,
+            'amount': amount})
+    recipes = {}
+    for row in Recipe.objects.filter(id__in=ids).order_by().values(
+            'id', 'name', *IMAGE_FIELDS, 'image_ready', 'text',
+            'cooking_time', 'pub_date',
+            *(f'author__{field}' for field in AUTHOR_FIELDS)):
+        author = {field: row[f'author__{field}'] for field in AUTHOR_FIELDS}
+        author['is_subscribed'] = False
+        recipes[row['id']] = {
+            'id': row['id'],
+            'tags': tags[row['id']],
+            'author': author,
+            'ingredients': ingredients[row['id']],
+            'is_favorited': False,
+            'is_in_shopping_cart': False,
+            'name': row['name'],
+            'image': get_image_url(row['image'], request),
+            'image_thumb': get_image_url(row['image_thumb'], request),
+            'image_detail': get_image_url(row['image_detail'], request),
+            'image_ready': row['image_ready'],
+            'text': row['text'],
+            'cooking_time': row['cooking_time'],
+            'pub_date': pub_date_field.to_representation(row['pub_date']),
+        }
+    return recipes
+
+
+class ValuesListMixin:
+    values_fields = ()
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(list(queryset.values(*self.values_fields)))
@@ -1,5 +1,53 @@
+from django import forms
+from django.db.models import Exists, OuterRef
+from django_filters import rest_framework as filters
 from rest_framework.filters import SearchFilter
 
+from recipes.models import Recipe, RecipeTag
+from recipes.search import search_recipes
+
 
 class IngredientSearchFilter(SearchFilter):
     search_param = 'name'
+
+
+class SlugMultipleField(forms.MultipleChoiceField):
+
+    def valid_value(self, value):
+        return True
+
+
+class SlugMultipleFilter(filters.MultipleChoiceFilter):
+    field_class = SlugMultipleField
+
+
+class RecipeFilter(filters.FilterSet):
+    author = filters.NumberFilter(field_name='author')
+    tags = SlugMultipleFilter(method='filter_tags')
+    is_favorited = filters.BooleanFilter(method='filter_flag')
+    is_in_shopping_cart = filters.BooleanFilter(method='filter_flag')
+    search = filters.CharFilter(method='filter_search')
+    ordering = filters.ChoiceFilter(
+        choices=(('popular', 'popular'),), method='filter_ordering')
+
+    class Meta:
+        model = Recipe
+        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart',
+                  'search', 'ordering')
+
+    def filter_tags(self, queryset, name, value):
+        return queryset.filter(Exists(RecipeTag.objects.filter(
+            recipe=OuterRef('pk'), tag__slug__in=value)))
+
+    def filter_flag(self, queryset, name, value):
+        if value:
+            return queryset.filter(**{name: True})
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def filter_ordering(self, queryset, name, value):
+        if value == 'popular':
+            return queryset.order_by('-favorites_count', '-pub_date', '-id')
+        return queryset
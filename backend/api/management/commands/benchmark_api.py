@@ -0,0 +1,272 @@
+import base64
+import json
+from functools import partial
+from io import BytesIO, StringIO
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import (CaptureQueriesContext, override_settings,
+                               setup_test_environment,
+                               teardown_test_environment)
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.fast import INGREDIENT_FIELDS, TAG_FIELDS, serialize_recipes
+from api.renderers import FastJSONRenderer, orjson
+from api.serializers import (IngredientSerializer, RecipeSerializer,
+                             TagSerializer)
+from recipes.images import executor, process_recipe_image
+from recipes.models import Ingredient, Recipe, Tag
+
+SERIALIZE_BATCH = 100
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[round(fraction * (len(values) - 1))]
+
+
+def make_image():
+    buffer = BytesIO()
+    Image.new('RGB', (64, 64), (226, 108, 45)).save(buffer, 'PNG')
+    return ('data:image/png;base64,'
+            + base64.b64encode(buffer.getvalue()).decode())
+
+
+class Command(BaseCommand):
+    help = ('Measure query count, latency and response size of API '
+            'endpoints on a synthetic dataset in a test database')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--recipes', type=int, default=500)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=10)
+        parser.add_argument('--follows', type=int, default=20)
+        parser.add_argument('--favorites', type=int, default=30)
+        parser.add_argument('--cart', type=int, default=20)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help='Путь для JSON-отчёта')
+        parser.add_argument('--baseline',
+                            help='JSON-отчёт для сравнения с ним')
+        parser.add_argument('--latency-threshold', type=float, default=1.25)
+        parser.add_argument('--keepdb', action='store_true')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            with TemporaryDirectory() as media_root, override_settings(
+                    MEDIA_ROOT=media_root):
+                cache.clear()
+                user = self.seed(options)
+                try:
+                    results = self.run_scenarios(user, options)
+                    serialization = self.measure_serialization(options)
+                finally:
+                    executor.shutdown(wait=True)
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        report = {
+            'database': connection.vendor,
+            'dataset': {key: options[key] for key in (
+                'users', 'recipes', 'ingredients_per_recipe', 'follows',
+                'favorites', 'cart', 'seed')},
+            'iterations': options['iterations'],
+            'results': results,
+            'serialization': serialization,
+        }
+        self.print_report(results)
+        self.print_serialization(serialization)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        if options['baseline']:
+            self.compare(results, options)
+
+    def seed(self, options):
+        call_command(
+            'seed_load', users=options['users'], recipes=options['recipes'],
+            ingredients_per_recipe=options['ingredients_per_recipe'],
+            follows=options['follows'], favorites=options['favorites'],
+            cart=options['cart'], seed=options['seed'], stdout=StringIO())
+        call_command('fanout_feeds', stdout=StringIO())
+        return Recipe.objects.order_by('-favorites_count').first().author
+
+    def get_scenarios(self, user):
+        recipe = Recipe.objects.filter(author=user).first()
+        ingredient_ids = list(
+            Ingredient.objects.values_list('id', flat=True)[:5])
+        tag_ids = list(Tag.objects.values_list('id', flat=True)[:2])
+        image = make_image()
+
+        def recipe_payload(i, prefix):
+            return {
+                'ingredients': [{'id': pk, 'amount': 10}
+                                for pk in ingredient_ids],
+                'tags': tag_ids,
+                'image': image,
+                'name': f'{prefix} {i}',
+                'text': 'Описание',
+                'cooking_time': 15,
+            }
+
+        return (
+            ('recipes_list', 'get',
+             lambda i: '/api/recipes/', lambda i: None),
+            ('recipes_list_limit_100', 'get',
+             lambda i: '/api/recipes/?limit=100', lambda i: None),
+            ('recipes_detail', 'get',
+             lambda i: f'/api/recipes/{recipe.id}/', lambda i: None),
+            ('recipes_create', 'post',
+             lambda i: '/api/recipes/',
+             lambda i: recipe_payload(i, 'Новый рецепт')),
+            ('recipes_update', 'patch',
+             lambda i: f'/api/recipes/{recipe.id}/',
+             lambda i: recipe_payload(i, 'Изменённый рецепт')),
+            ('recipes_feed', 'get',
+             lambda i: '/api/recipes/feed/', lambda i: None),
+            ('subscriptions', 'get',
+             lambda i: '/api/users/subscriptions/?recipes_limit=3',
+             lambda i: None),
+            ('ingredients_search', 'get',
+             lambda i: '/api/ingredients/?name=сок', lambda i: None),
+            ('shopping_cart_download', 'get',
+             lambda i: '/api/recipes/download_shopping_cart/',
+             lambda i: None),
+        )
+
+    def run_scenarios(self, user, options):
+        client = APIClient()
+        client.force_authenticate(user)
+        pending_images = []
+        patch_images = mock.patch(
+            'api.serializers.schedule_image_processing',
+            lambda recipe: transaction.on_commit(
+                partial(pending_images.append, recipe.id)))
+        results = {}
+        with patch_images:
+            for name, method, url, data in self.get_scenarios(user):
+                timings, queries, sizes = [], [], []
+                for i in range(options['iterations']):
+                    with CaptureQueriesContext(connection) as context:
+                        started = perf_counter()
+                        response = getattr(client, method)(
+                            url(i), data(i), format='json')
+                        content = (b''.join(response.streaming_content)
+                                   if response.streaming
+                                   else response.content)
+                        timings.append((perf_counter() - started) * 1000)
+                    while pending_images:
+                        process_recipe_image(pending_images.pop())
+                    if response.status_code >= 400:
+                        raise CommandError(
+                            f'{name}: {response.status_code} {content[:200]}')
+                    queries.append(len(context.captured_queries))
+                    sizes.append(len(content))
+                results[name] = {
+                    'queries': max(queries),
+                    'p50_ms': round(percentile(timings, 0.5), 2),
+                    'p95_ms': round(percentile(timings, 0.95), 2),
+                    'bytes': max(sizes),
+                }
+        return results
+
+    def measure_serialization(self, options):
+        request = APIRequestFactory().get('/api/recipes/')
+        anonymous = AnonymousUser()
+        ids = list(Recipe.objects.values_list('id', flat=True)[
+            :SERIALIZE_BATCH])
+        if not ids:
+            raise CommandError('Нет рецептов для замера сериализации!')
+
+        def serializer_path():
+            recipes = Recipe.objects.filter(id__in=ids).with_user_flags(
+                anonymous).with_related(anonymous)
+            data = RecipeSerializer(
+                recipes, many=True, context={'request': request}).data
+            return JSONRenderer().render(data)
+
+        def fast_path():
+            payloads = serialize_recipes(ids, request)
+            return FastJSONRenderer().render([payloads[pk] for pk in ids])
+
+        comparisons = (
+            ('recipes', serializer_path, fast_path),
+            ('tags',
+             lambda: JSONRenderer().render(
+                 TagSerializer(Tag.objects.all(), many=True).data),
+             lambda: FastJSONRenderer().render(
+                 list(Tag.objects.values(*TAG_FIELDS)))),
+            ('ingredients',
+             lambda: JSONRenderer().render(
+                 IngredientSerializer(Ingredient.objects.all(),
+                                      many=True).data),
+             lambda: FastJSONRenderer().render(
+                 list(Ingredient.objects.values(*INGREDIENT_FIELDS)))),
+        )
+        result = {'recipes_per_batch': len(ids)}
+        for name, slow, fast in comparisons:
+            for path, build in (('serializer', slow), ('fast', fast)):
+                timings = []
+                for _ in range(options['iterations']):
+                    started = perf_counter()
+                    build()
+                    timings.append((perf_counter() - started) * 1000)
+                result[f'{name}_{path}_ms'] = round(
+                    percentile(timings, 0.5), 2)
+        return result
+
+    def print_serialization(self, serialization):
+        self.stdout.write(
+            f'Сериализация {serialization["recipes_per_batch"]} рецептов '
+            f'(p50, включая выборку): '
+            f'сериализаторы {serialization["recipes_serializer_ms"]} мс, '
+            f'быстрый путь {serialization["recipes_fast_ms"]} мс '
+            f'({"orjson" if orjson else "json"}).')
+        for name in ('tags', 'ingredients'):
+            self.stdout.write(
+                f'Список {name}: сериализаторы '
+                f'{serialization[f"{name}_serializer_ms"]} мс, быстрый путь '
+                f'{serialization[f"{name}_fast_ms"]} мс.')
+
+    def print_report(self, results):
+        self.stdout.write(f'{"endpoint":<26}{"queries":>8}{"p50 ms":>10}'
+                          f'{"p95 ms":>10}{"bytes":>10}')
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<26}{result["queries"]:>8}{result["p50_ms"]:>10}'
+                f'{result["p95_ms"]:>10}{result["bytes"]:>10}')
+
+    def compare(self, results, options):
+        with open(options['baseline'], encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = []
+        for name, result in results.items():
+            expected = baseline.get(name)
+            if expected is None:
+                continue
+            if result['queries'] > expected['queries']:
+                regressions.append(
+                    f'{name}: запросов {result["queries"]} '
+                    f'вместо {expected["queries"]}')
+            limit = expected['p95_ms'] * options['latency_threshold']
+            if result['p95_ms'] > limit:
+                regressions.append(
+                    f'{name}: p95 {result["p95_ms"]} мс '
+                    f'при допустимых {limit:.2f} мс')
+        if regressions:
+            raise CommandError('Обнаружены регрессии:\n'
+                               + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('Регрессий не обнаружено.'))
@@ -0,0 +1,178 @@
+import asyncio
+import json
+from io import StringIO
+from itertools import cycle, islice
+from time import perf_counter, sleep
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncClient, Client
+from django.test.utils import (override_settings, setup_test_environment,
+                               teardown_test_environment)
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Recipe
+
+from .benchmark_api import percentile
+
+MODES = (
+    ('wsgi', 'backend.urls'),
+    ('asgi_sync', 'backend.urls'),
+    ('asgi', 'backend.async_urls'),
+)
+
+
+class DatabaseLatency:
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def __call__(self, execute, sql, params, many, context):
+        sleep(self.seconds)
+        return execute(sql, params, many, context)
+
+    def install(self, sender=None, connection=connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+
+class Command(BaseCommand):
+    help = ('Compare throughput and latency of the read API served by a '
+            'sync WSGI worker and by the ASGI mode with async views')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--recipes', type=int, default=500)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--db-latency-ms', type=float, default=2,
+                            help='Искусственная задержка каждого запроса к БД')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help='Путь для JSON-отчёта')
+        parser.add_argument('--keepdb', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('Число запросов и параллельность должны быть '
+                               'положительными!')
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        latency = DatabaseLatency(options['db_latency_ms'] / 1000)
+        try:
+            urls, token = self.seed(options)
+            latency.install()
+            connection_created.connect(latency.install)
+            results = {name: self.run_mode(name, urlconf, urls, token,
+                                           options)
+                       for name, urlconf in MODES}
+        finally:
+            connection_created.disconnect(latency.install)
+            if latency in connection.execute_wrappers:
+                connection.execute_wrappers.remove(latency)
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        self.print_report(results, options)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump({
+                    'database': connection.vendor,
+                    'requests': options['requests'],
+                    'concurrency': options['concurrency'],
+                    'db_latency_ms': options['db_latency_ms'],
+                    'results': results,
+                }, f, ensure_ascii=False, indent=2)
+
+    def seed(self, options):
+        call_command(
+            'seed_load', users=options['users'], recipes=options['recipes'],
+            seed=options['seed'], stdout=StringIO())
+        recipe = Recipe.objects.order_by('-favorites_count').first()
+        if recipe is None:
+            raise CommandError('Нет рецептов для нагрузочного теста!')
+        token, _ = Token.objects.get_or_create(user=recipe.author)
+        urls = (
+            '/api/recipes/',
+            f'/api/recipes/{recipe.id}/',
+            '/api/ingredients/?name=сок',
+            '/api/tags/',
+            '/api/users/subscriptions/?recipes_limit=3',
+        )
+        return urls, token.key
+
+    def run_mode(self, name, urlconf, urls, token, options):
+        with override_settings(ROOT_URLCONF=urlconf):
+            cache.clear()
+            if name == 'wsgi':
+                contents, timings, elapsed = self.run_sync(
+                    urls, token, options)
+            else:
+                contents, timings, elapsed = asyncio.run(
+                    self.run_async(urls, token, options))
+        if not hasattr(self, 'expected'):
+            self.expected = contents
+        elif contents != self.expected:
+            raise CommandError(f'{name}: ответы отличаются от WSGI!')
+        return {
+            'rps': round(options['requests'] / elapsed, 1),
+            'p50_ms': round(percentile(timings, 0.5), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+        }
+
+    def check_response(self, url, response):
+        if response.status_code >= 400:
+            raise CommandError(
+                f'{url}: {response.status_code} {response.content[:200]}')
+        return response.content
+
+    def run_sync(self, urls, token, options):
+        client = Client(HTTP_AUTHORIZATION=f'Token {token}')
+        contents = {url: self.check_response(url, client.get(url))
+                    for url in urls}
+        timings = []
+        started = perf_counter()
+        for url in islice(cycle(urls), options['requests']):
+            request_started = perf_counter()
+            self.check_response(url, client.get(url))
+            timings.append((perf_counter() - request_started) * 1000)
+        return contents, timings, perf_counter() - started
+
+    async def run_async(self, urls, token, options):
+        client = AsyncClient()
+        headers = {'authorization': f'Token {token}'}
+        contents = {
+            url: self.check_response(url, await client.get(url, **headers))
+            for url in urls}
+        semaphore = asyncio.Semaphore(options['concurrency'])
+        timings = []
+
+        async def fetch(url):
+            async with semaphore:
+                request_started = perf_counter()
+                self.check_response(url, await client.get(url, **headers))
+                timings.append((perf_counter() - request_started) * 1000)
+
+        started = perf_counter()
+        await asyncio.gather(*(
+            fetch(url) for url in islice(cycle(urls), options['requests'])))
+        elapsed = perf_counter() - started
+        await sync_to_async(connections.close_all)()
+        return contents, timings, elapsed
+
+    def print_report(self, results, options):
+        self.stdout.write(
+            f'{options["requests"]} запросов, параллельность '
+            f'{options["concurrency"]}, задержка БД '
+            f'{options["db_latency_ms"]} мс на запрос.')
+        self.stdout.write(f'{"mode":<12}{"rps":>10}{"p50 ms":>10}'
+                          f'{"p95 ms":>10}')
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<12}{result["rps"]:>10}{result["p50_ms"]:>10}'
+                f'{result["p95_ms"]:>10}')
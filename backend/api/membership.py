@@ -0,0 +1,78 @@
+import time
+from threading import Lock
+
+from django.core.cache import cache
+
+from recipes.models import Favorite, Follow, ShoppingList
+
+MEMBERSHIP_TIMEOUT = 300
+MEMBERSHIP_SOURCES = {
+    'favorites': (Favorite, 'recipe_id'),
+    'shopping_cart': (ShoppingList, 'recipe_id'),
+    'following': (Follow, 'author_id'),
+}
+
+
+def get_membership_version_key(user):
+    return f'membership:{user.pk}:version'
+
+
+def invalidate_membership(request):
+    cache.set(get_membership_version_key(request.user), time.time(), None)
+    request.membership = UserMembership(request.user)
+
+
+class UserMembership:
+
+    def __init__(self, user):
+        self.user = user
+        self._data = None
+        self._lock = Lock()
+
+    def get_cache_key(self):
+        version = cache.get_or_set(
+            get_membership_version_key(self.user), time.time, None)
+        return f'membership:{self.user.pk}:{version}'
+
+    def fetch(self, name):
+        model, field = MEMBERSHIP_SOURCES[name]
+        return frozenset(model.objects.filter(
+            user=self.user).values_list(field, flat=True))
+
+    def begin_load(self):
+        self._lock.acquire()
+        return self._data is None
+
+    def finish_load(self, data=None):
+        if data is not None:
+            self._data = data
+        self._lock.release()
+
+    def load(self):
+        data = None
+        try:
+            if self.begin_load():
+                key = self.get_cache_key()
+                data = cache.get(key)
+                if data is None:
+                    data = {name: self.fetch(name)
+                            for name in MEMBERSHIP_SOURCES}
+                    cache.set(key, data, MEMBERSHIP_TIMEOUT)
+        finally:
+            self.finish_load(data)
+        return self._data
+
+    def is_favorited(self, recipe):
+        return recipe.pk in self.load()['favorites']
+
+    def is_in_shopping_cart(self, recipe):
+        return recipe.pk in self.load()['shopping_cart']
+
+    def is_subscribed(self, author):
+        return author.pk in self.load()['following']
+
+
+def get_membership(request):
+    if getattr(request, 'membership', None) is None:
+        request.membership = UserMembership(request.user)
+    return request.membership
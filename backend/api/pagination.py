@@ -1,5 +1,55 @@
-from rest_framework.pagination import PageNumberPagination
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (Cursor, CursorPagination,
+                                       PageNumberPagination)
+
+from recipes.feed import get_feed
 
 
 class CustomPageNumberPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+
+
+class RecipeCursorPagination(CursorPagination):
+    ordering = ('-pub_date', '-id')
+    page_size_query_param = 'limit'
+
+
+class FeedCursorPagination(RecipeCursorPagination):
+
+    def paginate_feed(self, user, request):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.has_previous = False
+        cursor = self.decode_cursor(request)
+        position = None
+        if cursor is not None:
+            position = self.parse_position(cursor.position)
+        keys = get_feed(user, position, self.page_size + 1)
+        self.has_next = len(keys) > self.page_size
+        keys = keys[:self.page_size]
+        if self.has_next:
+            self.next_position = keys[-1]
+        return [recipe_id for _, recipe_id in keys]
+
+    def parse_position(self, position):
+        pub_date, _, pk = (position or '').partition('|')
+        try:
+            pub_date = parse_datetime(pub_date)
+            pk = int(pk)
+        except ValueError:
+            pub_date = None
+        if pub_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return pub_date, pk
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        pub_date, pk = self.next_position
+        return self.encode_cursor(Cursor(
+            offset=0, reverse=False, position=f'{pub_date.isoformat()}|{pk}'))
+
+    def get_previous_link(self):
+        return None
@@ -1,23 +1,42 @@
 import base64
+import binascii
+import uuid
 
 from django.core.files.base import ContentFile
+from django.db import transaction
 from rest_framework import serializers
 from djoser.serializers import UserSerializer, UserCreateSerializer
 
 from users.models import User
+from recipes.images import schedule_image_processing
 from recipes.models import (Recipe, Ingredient, Tag, RecipeIngredient,
-                            Follow, Favorite, ShoppingList)
+                            RecipeTag, Follow, Favorite, ShoppingList,
+                            ShoppingCartItem)
+from recipes.search import update_search_documents
+from .membership import get_membership
+from .shopping_cart import get_cart_users, update_cart_items
 
 MIN_VALUE = 1
 MAX_VALUE = 32000
+MAX_IMAGE_SIZE = 5 * 1024 * 1024
+MAX_PANTRY_INGREDIENTS = 100
 
 
 class Base64ImageField(serializers.ImageField):
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            header, _, imgstr = data.partition(';base64,')
+            if len(imgstr) * 3 // 4 > MAX_IMAGE_SIZE:
+                raise serializers.ValidationError(
+                    'Размер изображения не должен превышать '
+                    f'{MAX_IMAGE_SIZE // (1024 * 1024)} МБ!')
+            ext = header.split('/')[-1]
+            try:
+                data = ContentFile(base64.b64decode(imgstr, validate=True),
+                                   name=f'{uuid.uuid4().hex}.{ext}')
+            except (ValueError, binascii.Error):
+                raise serializers.ValidationError(
+                    'Загрузите корректное изображение!')
         return super().to_internal_value(data)
 
 
@@ -30,10 +49,12 @@ class CustomUserSerializer(UserSerializer):
                   'is_subscribed')
 
     def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        request = self.context.get('request')
+        if request.user.is_anonymous:
             return False
-        return user.follower.filter(author=obj).exists()
+        return get_membership(request).is_subscribed(obj)
 
 
 class CustomUserCreateSerializer(UserCreateSerializer):
@@ -78,27 +99,68 @@ class RecipeSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Recipe
-        fields = '__all__'
+        exclude = ('favorites_count', 'in_carts_count', 'ingredients_count',
+                   'fanned_out', 'search_document', 'updated_at')
 
     def get_ingredients(self, obj):
         queryset = obj.amounts
         return IngredientAmountSerializer(queryset, many=True).data
 
     def get_is_favorited(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
+        request = self.context.get('request')
+        if request.user.is_anonymous:
             return False
-        return user.favorite_user.filter(recipe=obj).exists()
+        return get_membership(request).is_favorited(obj)
 
     def get_is_in_shopping_cart(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
+        request = self.context.get('request')
+        if request.user.is_anonymous:
             return False
-        return user.shop_user.filter(recipe=obj).exists()
+        return get_membership(request).is_in_shopping_cart(obj)
+
+
+class PantryRecipeSerializer(RecipeSerializer):
+    coverage = serializers.FloatField(read_only=True)
+    missing_count = serializers.IntegerField(read_only=True)
+
+
+class PantrySearchSerializer(serializers.Serializer):
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False,
+        max_length=MAX_PANTRY_INGREDIENTS)
+    max_missing = serializers.IntegerField(min_value=0, required=False)
+
+
+class BulkPrimaryKeyRelatedField(serializers.ListField):
+    child = serializers.IntegerField(min_value=1)
+
+    def __init__(self, queryset, **kwargs):
+        self.queryset = queryset
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        ids = super().to_internal_value(data)
+        return get_objects_by_ids(self.queryset, ids)
+
+    def to_representation(self, value):
+        return [obj.pk for obj in value.all()]
+
+
+def get_objects_by_ids(queryset, ids):
+    objects = queryset.in_bulk(set(ids))
+    missing = sorted({pk for pk in ids if pk not in objects})
+    if missing:
+        raise serializers.ValidationError(
+            f'Объекты с id {missing} не существуют!')
+    return [objects[pk] for pk in ids]
 
 
 class IngredientAddSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField(min_value=1)
     amount = serializers.IntegerField()
 
     class Meta:
@@ -115,8 +177,7 @@ class IngredientAddSerializer(serializers.ModelSerializer):
 
 class RecipeAddSerializer(serializers.ModelSerializer):
     ingredients = IngredientAddSerializer(many=True)
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(), many=True)
+    tags = BulkPrimaryKeyRelatedField(queryset=Tag.objects.all())
     author = CustomUserSerializer(read_only=True)
     image = Base64ImageField(required=True, allow_null=False)
 
@@ -125,6 +186,15 @@ class RecipeAddSerializer(serializers.ModelSerializer):
         fields = ('id', 'tags', 'author', 'ingredients', 'name', 'image',
                   'text', 'cooking_time')
 
+    def validate_ingredients(self, value):
+        ingredients = get_objects_by_ids(
+            Ingredient.objects.all(),
+            [ingredient.get('id') for ingredient in value]
+        )
+        for item, ingredient in zip(value, ingredients):
+            item['id'] = ingredient
+        return value
+
     def validate(self, data):
         cooking_time = data['cooking_time']
         if not (MIN_VALUE <= cooking_time <= MAX_VALUE):
@@ -165,41 +235,114 @@ class RecipeAddSerializer(serializers.ModelSerializer):
 
     @staticmethod
     def create_recipe_tag(tags_list, recipe):
-        for tag in tags_list:
-            recipe.tags.add(tag)
+        RecipeTag.objects.bulk_create(
+            [RecipeTag(recipe=recipe, tag=tag) for tag in tags_list])
 
+    @staticmethod
+    def update_recipe_ingredient(ingredients, recipe):
+        current = {obj.ingredient_id: obj for obj in recipe.amounts.all()}
+        new = {ingredient.get('id').id: ingredient.get('amount')
+               for ingredient in ingredients}
+        to_create = []
+        to_update = []
+        changes = {}
+        for ingredient_id, amount in new.items():
+            obj = current.get(ingredient_id)
+            if obj is None:
+                to_create.append(RecipeIngredient(
+                    recipe=recipe, ingredient_id=ingredient_id, amount=amount))
+                changes[ingredient_id] = (amount, 1)
+            elif obj.amount != amount:
+                changes[ingredient_id] = (amount - obj.amount, 0)
+                obj.amount = amount
+                to_update.append(obj)
+        to_delete = []
+        for ingredient_id, obj in current.items():
+            if ingredient_id not in new:
+                to_delete.append(obj.id)
+                changes[ingredient_id] = (-obj.amount, -1)
+        if to_delete:
+            RecipeIngredient.objects.filter(id__in=to_delete).delete()
+        if to_update:
+            RecipeIngredient.objects.bulk_update(to_update, ['amount'])
+        if to_create:
+            RecipeIngredient.objects.bulk_create(to_create)
+        if changes:
+            update_cart_items(get_cart_users(recipe), changes)
+
+    @staticmethod
+    def update_recipe_tag(tags_list, recipe):
+        current = set(recipe.recipe_tag.values_list('tag_id', flat=True))
+        new = {tag.id for tag in tags_list}
+        if current - new:
+            recipe.recipe_tag.filter(tag_id__in=current - new).delete()
+        if new - current:
+            RecipeTag.objects.bulk_create([
+                RecipeTag(recipe=recipe, tag_id=tag_id)
+                for tag_id in new - current
+            ])
+
+    @transaction.atomic
     def create(self, validated_data):
-        author_id = self.context.get('request').user.id
-        author = User.objects.get(id=author_id)
+        author = self.context.get('request').user
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
-        recipe = Recipe.objects.create(author=author, **validated_data)
+        recipe = Recipe.objects.create(
+            author=author, image_ready=False,
+            ingredients_count=len(ingredients), **validated_data)
 
         self.create_recipe_ingredient(ingredients, recipe)
         self.create_recipe_tag(tags, recipe)
+        update_search_documents([recipe.id])
+        schedule_image_processing(recipe)
         return recipe
 
     def to_representation(self, instance):
         request = self.context.get('request')
         context = {'request': request}
+        instance = Recipe.objects.with_user_flags(request.user).with_related(
+            request.user).get(pk=instance.pk)
         return RecipeSerializer(instance, context=context).data
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        instance.amounts.all().delete()
-        instance.recipe_tag.all().delete()
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
 
-        self.create_recipe_ingredient(ingredients, instance)
-        self.create_recipe_tag(tags, instance)
-        return super().update(instance, validated_data)
+        self.update_recipe_ingredient(ingredients, instance)
+        self.update_recipe_tag(tags, instance)
+        instance.ingredients_count = len(ingredients)
+        new_image = 'image' in validated_data
+        if new_image:
+            validated_data['image_ready'] = False
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        instance.save(update_fields=[
+            *validated_data, 'ingredients_count', 'updated_at'])
+        update_search_documents([instance.id])
+        if new_image:
+            schedule_image_processing(instance)
+        return instance
+
+
+class ShoppingCartItemSerializer(serializers.ModelSerializer):
+    id = serializers.ReadOnlyField(source='ingredient.id')
+    name = serializers.ReadOnlyField(source='ingredient.name')
+    measurement_unit = serializers.ReadOnlyField(
+        source='ingredient.measurement_unit')
+    amount = serializers.ReadOnlyField(source='total_amount')
+
+    class Meta:
+        model = ShoppingCartItem
+        fields = ('id', 'name', 'measurement_unit', 'amount',
+                  'recipes_count')
 
 
 class ShortRecipeSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_thumb', 'cooking_time')
 
 
 class FollowSerializer(serializers.ModelSerializer):
@@ -213,21 +356,27 @@ class FollowSerializer(serializers.ModelSerializer):
                   'recipes', 'recipes_count', 'is_subscribed')
 
     def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
         return obj.recipes.count()
 
     def get_recipes(self, obj):
+        if hasattr(obj, 'recent_recipes'):
+            return ShortRecipeSerializer(obj.recent_recipes, many=True).data
         recipes = obj.recipes.all()
         recipes_limit = self.context.get(
             'request').query_params.get('recipes_limit')
-        if recipes_limit:
+        if recipes_limit and recipes_limit.isdigit():
             recipes = recipes[:int(recipes_limit)]
         return ShortRecipeSerializer(recipes, many=True).data
 
     def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        request = self.context.get('request')
+        if request.user.is_anonymous:
             return False
-        return user.follower.filter(author=obj).exists()
+        return get_membership(request).is_subscribed(obj)
 
 
 class FollowAddSerializer(serializers.ModelSerializer):
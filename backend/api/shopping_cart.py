@@ -0,0 +1,126 @@
+import csv
+import json
+
+from django.db.models import Count, Sum
+
+from recipes.models import RecipeIngredient, ShoppingCartItem, ShoppingList
+
+BATCH_SIZE = 1000
+
+
+class Echo:
+
+    def write(self, value):
+        return value
+
+
+def get_shopping_cart(user):
+    return ShoppingCartItem.objects.filter(user=user).values(
+        'ingredient__name', 'ingredient__measurement_unit', 'total_amount'
+    ).order_by('ingredient__name', 'ingredient__measurement_unit')
+
+
+def get_recipe_amounts(recipe, sign=1):
+    return {
+        ingredient_id: (sign * amount, sign)
+        for ingredient_id, amount in RecipeIngredient.objects.filter(
+            recipe=recipe).values_list('ingredient_id', 'amount')
+    }
+
+
+def update_cart_items(user_ids, changes):
+    user_ids = list(user_ids)
+    if not user_ids or not changes:
+        return
+    added = [ingredient_id for ingredient_id, (_, recipes) in changes.items()
+             if recipes > 0]
+    if added:
+        ShoppingCartItem.objects.bulk_create([
+            ShoppingCartItem(user_id=user_id, ingredient_id=ingredient_id,
+                             total_amount=0, recipes_count=0)
+            for user_id in user_ids
+            for ingredient_id in added
+        ], batch_size=BATCH_SIZE, ignore_conflicts=True)
+    to_update, to_delete = [], []
+    for item in ShoppingCartItem.objects.select_for_update().filter(
+            user_id__in=user_ids, ingredient_id__in=changes):
+        amount, recipes = changes[item.ingredient_id]
+        item.total_amount += amount
+        item.recipes_count += recipes
+        if item.recipes_count > 0:
+            to_update.append(item)
+        else:
+            to_delete.append(item.id)
+    if to_delete:
+        ShoppingCartItem.objects.filter(id__in=to_delete).delete()
+    if to_update:
+        ShoppingCartItem.objects.bulk_update(
+            to_update, ['total_amount', 'recipes_count'],
+            batch_size=BATCH_SIZE)
+
+
+def get_cart_users(recipe):
+    return ShoppingList.objects.filter(recipe=recipe).values_list(
+        'user_id', flat=True)
+
+
+def rebuild_cart_items(user_ids=None):
+    items = ShoppingCartItem.objects.all()
+    rows = ShoppingList.objects.all()
+    if user_ids is not None:
+        items = items.filter(user_id__in=user_ids)
+        rows = rows.filter(user_id__in=user_ids)
+    items.delete()
+    rows = rows.filter(recipe__amounts__isnull=False).values(
+        'user_id', 'recipe__amounts__ingredient_id'
+    ).annotate(
+        total=Sum('recipe__amounts__amount'), recipes=Count('recipe')
+    ).order_by()
+    created = 0
+    batch = []
+    for row in rows.iterator():
+        batch.append(ShoppingCartItem(
+            user_id=row['user_id'],
+            ingredient_id=row['recipe__amounts__ingredient_id'],
+            total_amount=row['total'], recipes_count=row['recipes']))
+        if len(batch) >= BATCH_SIZE:
+            ShoppingCartItem.objects.bulk_create(batch)
+            created += len(batch)
+            batch = []
+    ShoppingCartItem.objects.bulk_create(batch)
+    return created + len(batch)
+
+
+def stream_txt(rows):
+    for row in rows:
+        yield (f"{row['ingredient__name']} "
+               f"({row['ingredient__measurement_unit']}) - "
+               f"{row['total_amount']}\n")
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for row in rows:
+        yield writer.writerow((row['ingredient__name'],
+                               row['ingredient__measurement_unit'],
+                               row['total_amount']))
+
+
+def stream_json(rows):
+    separator = '['
+    for row in rows:
+        yield separator + json.dumps({
+            'name': row['ingredient__name'],
+            'measurement_unit': row['ingredient__measurement_unit'],
+            'amount': row['total_amount']
+        }, ensure_ascii=False)
+        separator = ','
+    yield '[]' if separator == '[' else ']'
+
+
+SHOPPING_CART_STREAMS = {
+    'txt': stream_txt,
+    'csv': stream_csv,
+    'json': stream_json,
+}
@@ -0,0 +1,96 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from recipes.feed import backfill_feed, fan_out_recipe, remove_from_feed
+from recipes.models import (Follow, Ingredient, Recipe, RecipeIngredient,
+                            RecipeTag, Tag)
+from recipes.search import update_search_documents
+from users.models import User
+from .autocomplete import ingredient_index
+from .cache import bump_cache_version
+from .shopping_cart import (get_cart_users, get_recipe_amounts,
+                            update_cart_items)
+
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    transaction.on_commit(ingredient_index.invalidate)
+
+
+@receiver([post_save, post_delete], sender=Ingredient)
+@receiver([post_save, post_delete], sender=Tag)
+def invalidate_reference_cache(sender, **kwargs):
+    transaction.on_commit(partial(bump_cache_version, sender))
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_document(sender, instance, update_fields, **kwargs):
+    if update_fields is None or {'name', 'text'} & set(update_fields):
+        update_search_documents([instance.id])
+
+
+@receiver(post_save, sender=Ingredient)
+def update_ingredient_search_documents(sender, instance, created, **kwargs):
+    if not created:
+        update_search_documents(
+            instance.amounts.values_list('recipe_id', flat=True))
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_new_recipe(sender, instance, created, **kwargs):
+    if created:
+        fan_out_recipe(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_follower_feed(sender, instance, created, **kwargs):
+    if created:
+        backfill_feed(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clean_follower_feed(sender, instance, **kwargs):
+    remove_from_feed(instance.user_id, instance.author_id)
+
+
+@receiver(pre_delete, sender=Recipe)
+def remove_recipe_from_carts(sender, instance, **kwargs):
+    update_cart_items(get_cart_users(instance),
+                      get_recipe_amounts(instance, -1))
+
+
+@receiver([post_save, post_delete], sender=Recipe)
+@receiver([post_save, post_delete], sender=RecipeIngredient)
+@receiver([post_save, post_delete], sender=RecipeTag)
+def invalidate_recipe_cache(sender, **kwargs):
+    transaction.on_commit(partial(bump_cache_version, Recipe))
+
+
+def get_author_values(instance):
+    return {field: instance.__dict__.get(field) for field in AUTHOR_FIELDS}
+
+
+@receiver(post_init, sender=User)
+def remember_author_values(sender, instance, **kwargs):
+    instance._author_values = get_author_values(instance)
+
+
+@receiver(post_save, sender=User)
+def update_author_recipes(sender, instance, created, update_fields=None,
+                          **kwargs):
+    values = get_author_values(instance)
+    changed = (not created and values != instance._author_values
+               and (update_fields is None
+                    or AUTHOR_FIELDS & set(update_fields)))
+    instance._author_values = values
+    if changed:
+        Recipe.objects.filter(author=instance).update(
+            updated_at=timezone.now())
+        transaction.on_commit(partial(bump_cache_version, Recipe))
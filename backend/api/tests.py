@@ -0,0 +1,133 @@
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from api.serializers import (IngredientSerializer, RecipeSerializer,
+                             TagSerializer)
+from recipes.models import (Favorite, Follow, Ingredient, Recipe,
+                            RecipeIngredient, RecipeTag, ShoppingList, Tag)
+from users.models import User
+
+RECIPES_COUNT = 35
+ANONYMOUS_LIST_QUERIES = 5
+AUTHENTICATED_LIST_QUERIES = 8
+ANONYMOUS_CURSOR_QUERIES = 4
+AUTHENTICATED_CURSOR_QUERIES = 4
+
+
+class RecipeAPITestCase(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass',
+            first_name='Автор', last_name='Рецептов')
+        cls.user = User.objects.create_user(
+            username='user', email='user@example.com', password='pass',
+            first_name='Пользователь', last_name='Тестовый')
+        tags = [
+            Tag.objects.create(name='Завтрак', color='#E26C2D',
+                               slug='breakfast'),
+            Tag.objects.create(name='Обед', color='#49B64E', slug='lunch'),
+        ]
+        ingredients = [
+            Ingredient.objects.create(name=f'Ингредиент {i}',
+                                      measurement_unit='г')
+            for i in range(3)
+        ]
+        for i in range(RECIPES_COUNT):
+            recipe = Recipe.objects.create(
+                author=cls.author if i % 2 else cls.user,
+                name=f'Рецепт {i}', text='Описание',
+                image='recipes/images/test.png', cooking_time=i + 1,
+                ingredients_count=len(ingredients))
+            RecipeIngredient.objects.bulk_create([
+                RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                                 amount=i + 1)
+                for ingredient in ingredients
+            ])
+            RecipeTag.objects.bulk_create([
+                RecipeTag(recipe=recipe, tag=tag) for tag in tags
+            ])
+            if i % 3 == 0:
+                Favorite.objects.create(user=cls.user, recipe=recipe)
+            if i % 4 == 0:
+                ShoppingList.objects.create(user=cls.user, recipe=recipe)
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+
+class RecipeListQueriesTest(RecipeAPITestCase):
+
+    def assert_list_queries(self, expected, params=''):
+        for limit in (6, 30):
+            cache.clear()
+            with self.subTest(limit=limit), self.assertNumQueries(expected):
+                response = self.client.get(
+                    f'/api/recipes/?{params}limit={limit}')
+                self.assertEqual(len(response.json()['results']), limit)
+
+    def test_anonymous_list_queries_do_not_grow_with_limit(self):
+        self.assert_list_queries(ANONYMOUS_LIST_QUERIES)
+
+    def test_authenticated_list_queries_do_not_grow_with_limit(self):
+        self.client.force_authenticate(self.user)
+        self.assert_list_queries(AUTHENTICATED_LIST_QUERIES)
+
+    def test_anonymous_cursor_queries_do_not_grow_with_limit(self):
+        self.assert_list_queries(ANONYMOUS_CURSOR_QUERIES, 'cursor=&')
+
+    def test_authenticated_cursor_queries_do_not_grow_with_limit(self):
+        self.client.force_authenticate(self.user)
+        self.assert_list_queries(AUTHENTICATED_CURSOR_QUERIES, 'cursor=&')
+
+
+class FastRenderingTest(RecipeAPITestCase):
+
+    def render_recipes(self, response, recipe_ids):
+        user = response.wsgi_request.user
+        recipes = Recipe.objects.with_user_flags(user).with_related(
+            user).in_bulk(recipe_ids)
+        return RecipeSerializer(
+            [recipes[pk] for pk in recipe_ids], many=True,
+            context={'request': response.wsgi_request}).data
+
+    def assert_list_matches_serializer(self):
+        response = self.client.get('/api/recipes/?limit=30')
+        data = response.json()
+        expected = {
+            'count': data['count'],
+            'next': data['next'],
+            'previous': data['previous'],
+            'results': self.render_recipes(
+                response, [recipe['id'] for recipe in data['results']]),
+        }
+        self.assertEqual(response.content, JSONRenderer().render(expected))
+
+    def assert_detail_matches_serializer(self):
+        recipe = Recipe.objects.filter(author=self.author).first()
+        response = self.client.get(f'/api/recipes/{recipe.id}/')
+        self.assertEqual(
+            response.content,
+            JSONRenderer().render(self.render_recipes(response,
+                                                      [recipe.id])[0]))
+
+    def test_anonymous_recipes_match_serializer(self):
+        self.assert_list_matches_serializer()
+        self.assert_detail_matches_serializer()
+
+    def test_authenticated_recipes_match_serializer(self):
+        self.client.force_authenticate(self.user)
+        self.assert_list_matches_serializer()
+        self.assert_detail_matches_serializer()
+
+    def test_tags_and_ingredients_match_serializer(self):
+        for url, serializer in (
+                ('/api/tags/', TagSerializer(Tag.objects.all(), many=True)),
+                ('/api/ingredients/',
+                 IngredientSerializer(Ingredient.objects.all(), many=True))):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).content,
+                                 JSONRenderer().render(serializer.data))
@@ -3,7 +3,7 @@ from rest_framework.routers import DefaultRouter
 
 from .views import (RecipeViewSet, IngredientViewSet, TagViewSet,
                     FollowViewSet, APIFollowAddDelete, APIFaforiteAddDelete,
-                    APIShoppingListAddDelete)
+                    APIShoppingListAddDelete, ResponseCacheStatsView)
 
 app_name = 'api'
 
@@ -18,6 +18,7 @@ urlpatterns = [
     path('recipes/<int:id>/favorite/', APIFaforiteAddDelete.as_view()),
     path('recipes/<int:id>/shopping_cart/',
          APIShoppingListAddDelete.as_view()),
+    path('cache/stats/', ResponseCacheStatsView.as_view()),
     path('', include(router_v1.urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken'))
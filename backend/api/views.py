@@ -1,106 +1,221 @@
-import io
-
 from rest_framework import viewsets, mixins, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.decorators import action
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from django.db import transaction
+from django.db.models import (BooleanField, Count, F, OuterRef, Prefetch,
+                              Subquery, Value)
 from django.shortcuts import get_object_or_404
-from django.http import HttpResponse
+from django_filters.rest_framework import DjangoFilterBackend
+from django.http import StreamingHttpResponse
 
 from users.models import User
-from recipes.models import (Recipe, Ingredient, Tag, RecipeIngredient)
+from recipes.models import Recipe, Ingredient, Tag, ShoppingCartItem
 from .serializers import (RecipeSerializer, RecipeAddSerializer,
                           IngredientSerializer, TagSerializer,
                           FollowSerializer, ShoppingListSerializer,
-                          FollowAddSerializer, FavoriteSerializer)
+                          FollowAddSerializer, FavoriteSerializer,
+                          PantryRecipeSerializer, PantrySearchSerializer,
+                          ShoppingCartItemSerializer)
+from .autocomplete import (ingredient_index, AUTOCOMPLETE_LIMIT,
+                           AUTOCOMPLETE_MAX_LIMIT)
+from .fast import (INGREDIENT_FIELDS, TAG_FIELDS, ValuesListMixin,
+                   serialize_recipes)
+from .cache import (AnonymousResponseCacheMixin, CachedReadOnlyMixin,
+                    SharedPayloadMixin, get_cache_stats)
+from .membership import get_membership, invalidate_membership
 from .permissions import AuthorOrAdminOrReadOnly
-from .filters import IngredientSearchFilter
-from .pagination import CustomPageNumberPagination
+from .filters import IngredientSearchFilter, RecipeFilter
+from .pagination import (CustomPageNumberPagination, FeedCursorPagination,
+                         RecipeCursorPagination)
+from .renderers import PlainTextRenderer, CSVRenderer, FastJSONRenderer
+from .shopping_cart import (get_recipe_amounts, get_shopping_cart,
+                            update_cart_items, SHOPPING_CART_STREAMS)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(AnonymousResponseCacheMixin, SharedPayloadMixin,
+                    viewsets.ModelViewSet):
     serializer_class = RecipeSerializer
     permission_classes = (AuthorOrAdminOrReadOnly,)
     http_method_names = ['get', 'post', 'patch', 'delete']
     pagination_class = CustomPageNumberPagination
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = RecipeFilter
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
+    response_cache_prefix = 'recipes'
+    response_cache_models = (Recipe, Tag, Ingredient)
+    response_cache_params = ('page', 'limit', 'tags', 'author')
+    payload_cache_prefix = 'recipe'
+    payload_cache_models = (Tag, Ingredient)
+    payload_builder = staticmethod(serialize_recipes)
+
+    @property
+    def paginator(self):
+        if (not hasattr(self, '_paginator')
+                and self.action == 'list'
+                and RecipeCursorPagination.cursor_query_param
+                in self.request.query_params):
+            self._paginator = RecipeCursorPagination()
+        return super().paginator
 
     def get_queryset(self):
-        queryset = Recipe.objects.all()
-        author = self.request.query_params.get('author')
-        is_favorited = self.request.query_params.get('is_favorited')
-        is_in_shopping_cart = self.request.query_params.get(
-            'is_in_shopping_cart')
-        tags = dict(self.request.query_params).get('tags')
         user = self.request.user
-        if author:
-            queryset = queryset.filter(author=author)
-        if tags:
-            tags_id = []
-            for tag in tags:
-                tags_id.append(get_object_or_404(Tag, slug=tag))
-            queryset = queryset.filter(tags__in=tags_id).distinct()
-        if is_favorited:
-            queryset = queryset.filter(favorite_recipe__user=user)
-        if is_in_shopping_cart:
-            queryset = queryset.filter(shop_recipe__user=user)
+        queryset = Recipe.objects.with_user_flags(user)
+        if self.action in ('list', 'retrieve', 'pantry'):
+            queryset = queryset.with_related(user)
         return queryset
 
+    def use_shared_payloads(self):
+        return not isinstance(self.paginator, RecipeCursorPagination)
+
+    def get_payload_queryset(self):
+        return Recipe.objects.with_user_flags(self.request.user)
+
+    def apply_overlay(self, payloads):
+        if self.request.user.is_anonymous:
+            return payloads
+        membership = get_membership(self.request).load()
+        return [{
+            **payload,
+            'author': {
+                **payload['author'],
+                'is_subscribed':
+                    payload['author']['id'] in membership['following'],
+            },
+            'is_favorited': payload['id'] in membership['favorites'],
+            'is_in_shopping_cart':
+                payload['id'] in membership['shopping_cart'],
+        } for payload in payloads]
+
     def get_serializer_class(self):
         if self.action == 'list' or self.action == 'retrieve':
             return RecipeSerializer
         return RecipeAddSerializer
 
+    @action(detail=False, methods=['get'],
+            renderer_classes=[JSONRenderer, BrowsableAPIRenderer])
+    def pantry(self, request):
+        data = {'ingredients': [
+            value for raw in request.query_params.getlist('ingredients')
+            for value in raw.split(',') if value
+        ]}
+        if 'max_missing' in request.query_params:
+            data['max_missing'] = request.query_params['max_missing']
+        params = PantrySearchSerializer(data=data)
+        params.is_valid(raise_exception=True)
+        queryset = self.filter_queryset(
+            self.get_queryset()).with_pantry_coverage(
+            params.validated_data['ingredients'])
+        if 'max_missing' in params.validated_data:
+            queryset = queryset.filter(
+                missing_count__lte=params.validated_data['max_missing'])
+        page = self.paginate_queryset(queryset)
+        serializer = PantryRecipeSerializer(
+            page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
+
     @action(detail=False, methods=['get'],
             permission_classes=[IsAuthenticated])
+    def feed(self, request):
+        paginator = FeedCursorPagination()
+        ids = paginator.paginate_feed(request.user, request)
+        versions = dict(self.get_payload_rows(
+            Recipe.objects.filter(id__in=ids)))
+        rows = [(pk, versions[pk]) for pk in ids if pk in versions]
+        return paginator.get_paginated_response(
+            self.apply_overlay(self.get_shared_payloads(rows)))
+
+    @action(detail=False, methods=['get'],
+            permission_classes=[IsAuthenticated])
+    def shopping_cart(self, request):
+        items = ShoppingCartItem.objects.filter(
+            user=request.user
+        ).select_related('ingredient').order_by(
+            'ingredient__name', 'ingredient__measurement_unit')
+        serializer = ShoppingCartItemSerializer(items, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'],
+            permission_classes=[IsAuthenticated],
+            renderer_classes=[PlainTextRenderer, CSVRenderer, JSONRenderer])
     def download_shopping_cart(self, request):
-        shopping_list = {}
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__shop_recipe__user=request.user).values_list(
-            'ingredient__name', 'ingredient__measurement_unit', 'amount')
-        for ingredient in ingredients:
-            if ingredient[0] not in shopping_list:
-                shopping_list[ingredient[0]] = {
-                    'measurement_unit': ingredient[1],
-                    'amount': ingredient[2]
-                }
-            else:
-                shopping_list[ingredient[0]]['amount'] += ingredient[2]
-        text = ''
-        for key, value in shopping_list.items():
-            text += (f"{key} ({value['measurement_unit']}) - "
-                     f"{value['amount']}\n")
-        buffer = io.StringIO()
-        buffer.write(text)
-        response = HttpResponse(buffer.getvalue(), content_type='text/plain')
+        file_format = request.accepted_renderer.format
+        rows = get_shopping_cart(request.user).iterator()
+        response = StreamingHttpResponse(
+            SHOPPING_CART_STREAMS[file_format](rows),
+            content_type=f'{request.accepted_renderer.media_type}; '
+                         f'charset=utf-8'
+        )
         response['Content-Disposition'] = (
-            'attachment; filename=shopping_list.txt')
+            f'attachment; filename=shopping_list.{file_format}')
         return response
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CachedReadOnlyMixin, ValuesListMixin,
+                        viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
+    values_fields = INGREDIENT_FIELDS
     filter_backends = (IngredientSearchFilter,)
     search_fields = ('^name',)
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name and request.query_params.get('autocomplete'):
+            limit = request.query_params.get('limit', '')
+            limit = (min(int(limit), AUTOCOMPLETE_MAX_LIMIT)
+                     if limit.isdigit() else AUTOCOMPLETE_LIMIT)
+            return Response(ingredient_index.search(name, limit))
+        return super().list(request, *args, **kwargs)
+
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(CachedReadOnlyMixin, ValuesListMixin,
+                 viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
+    values_fields = TAG_FIELDS
     pagination_class = None
 
 
+class ResponseCacheStatsView(APIView):
+    permission_classes = (IsAdminUser,)
+    cached_views = (RecipeViewSet,)
+
+    def get(self, request):
+        return Response({
+            view.response_cache_prefix: get_cache_stats(
+                view.response_cache_prefix)
+            for view in self.cached_views
+        })
+
+
 class FollowViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
     serializer_class = FollowSerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = CustomPageNumberPagination
 
     def get_queryset(self):
-        queryset = User.objects.filter(following__user=self.request.user)
-        limit = self.request.query_params.get('limit')
-        if limit:
-            queryset = queryset[:int(limit)]
-        return queryset
+        recipes = Recipe.objects.all()
+        recipes_limit = self.request.query_params.get('recipes_limit')
+        if recipes_limit and recipes_limit.isdigit():
+            recipes = recipes.filter(pk__in=Subquery(
+                Recipe.objects.filter(
+                    author=OuterRef('author')
+                ).values('pk')[:int(recipes_limit)]
+            ))
+        return User.objects.filter(
+            following__user=self.request.user
+        ).annotate(
+            recipes_count=Count('recipes'),
+            is_subscribed=Value(True, output_field=BooleanField())
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='recent_recipes')
+        ).order_by('username')
 
 
 class APIFollowAddDelete(APIView):
@@ -115,6 +230,7 @@ class APIFollowAddDelete(APIView):
         )
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        invalidate_membership(request)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete(self, request, id):
@@ -127,6 +243,7 @@ class APIFollowAddDelete(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         follow.delete()
+        invalidate_membership(request)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -134,6 +251,11 @@ class APIFaforiteAddDelete(APIFollowAddDelete):
     permission_classes = [IsAuthenticated]
     serializer_class = FavoriteSerializer
     model = Recipe
+    counter_field = 'favorites_count'
+
+    def update_counter(self, recipe, delta):
+        self.model.objects.filter(id=recipe.id).update(
+            **{self.counter_field: F(self.counter_field) + delta})
 
     def post(self, request, id):
         obj = get_object_or_404(self.model, id=id)
@@ -142,7 +264,10 @@ class APIFaforiteAddDelete(APIFollowAddDelete):
             context={'request': request}
         )
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            serializer.save()
+            self.update_counter(obj, 1)
+        invalidate_membership(request)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete(self, request, id):
@@ -154,12 +279,21 @@ class APIFaforiteAddDelete(APIFollowAddDelete):
                 {'error': 'Этого рецепта нет в избранном!'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        favorite.delete()
+        with transaction.atomic():
+            favorite.delete()
+            self.update_counter(recipe, -1)
+        invalidate_membership(request)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class APIShoppingListAddDelete(APIFaforiteAddDelete):
     serializer_class = ShoppingListSerializer
+    counter_field = 'in_carts_count'
+
+    def update_counter(self, recipe, delta):
+        super().update_counter(recipe, delta)
+        update_cart_items([self.request.user.id],
+                          get_recipe_amounts(recipe, delta))
 
     def delete(self, request, id):
         recipe = get_object_or_404(self.model, id=id)
@@ -170,5 +304,8 @@ class APIShoppingListAddDelete(APIFaforiteAddDelete):
                 {'error': 'Этого рецепта нет в списке покупок!'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        shopping_object.delete()
+        with transaction.atomic():
+            shopping_object.delete()
+            self.update_counter(recipe, -1)
+        invalidate_membership(request)
         return Response(status=status.HTTP_204_NO_CONTENT)
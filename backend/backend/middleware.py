@@ -0,0 +1,116 @@
+import json
+import logging
+import re
+from collections import Counter
+from contextlib import ExitStack
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+from rest_framework import serializers
+
+logger = logging.getLogger('backend.profiling')
+current_metrics = ContextVar('current_metrics', default=None)
+
+IN_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+
+
+class RequestMetrics:
+
+    def __init__(self):
+        self.queries = Counter()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.serialize_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += perf_counter() - started
+            self.query_count += 1
+            self.queries[IN_LIST.sub('(...)', sql)] += 1
+
+    def duplicates(self, threshold):
+        return [(sql, count) for sql, count in self.queries.most_common()
+                if count >= threshold]
+
+
+def timed_data(prop):
+    @wraps(prop.fget)
+    def data(self):
+        metrics = current_metrics.get()
+        if metrics is None or metrics.serialize_depth:
+            return prop.fget(self)
+        metrics.serialize_depth += 1
+        db_time = metrics.db_time
+        started = perf_counter()
+        try:
+            return prop.fget(self)
+        finally:
+            metrics.serialize_depth -= 1
+            metrics.serialize_time += (perf_counter() - started
+                                       - (metrics.db_time - db_time))
+    return property(data)
+
+
+def instrument_serializers():
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        if not getattr(cls.data.fget, '__wrapped__', None):
+            cls.data = timed_data(cls.data)
+
+
+class RequestProfilingMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold = settings.PROFILING_DUPLICATE_QUERY_THRESHOLD
+        instrument_serializers()
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        started = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        total = perf_counter() - started
+        view = total - metrics.db_time - metrics.serialize_time
+        duplicates = metrics.duplicates(self.threshold)
+
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={metrics.db_time * 1000:.1f};'
+            f'desc="{metrics.query_count} queries"',
+            f'serialize;dur={metrics.serialize_time * 1000:.1f}',
+            f'view;dur={view * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ))
+        record = {
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'queries': metrics.query_count,
+            'db_ms': round(metrics.db_time * 1000, 2),
+            'serialize_ms': round(metrics.serialize_time * 1000, 2),
+            'view_ms': round(view * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+        }
+        if duplicates:
+            response['X-Duplicate-Queries'] = str(len(duplicates))
+            record['duplicates'] = [
+                {'count': count, 'sql': sql[:200]}
+                for sql, count in duplicates
+            ]
+            logger.warning(json.dumps(record, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(record, ensure_ascii=False))
+        return response
@@ -1,7 +1,16 @@
 from django.contrib import admin
+from django.utils import timezone
 
 from .models import (Recipe, Ingredient, Tag, RecipeIngredient, RecipeTag,
                      Follow, Favorite, ShoppingList)
+from .search import update_search_documents
+
+
+def refresh_recipes(recipe_ids):
+    update_search_documents(recipe_ids)
+    recipes = Recipe.objects.filter(id__in=recipe_ids)
+    recipes.update_ingredients_count()
+    recipes.update(updated_at=timezone.now())
 
 
 class RecipeIngredientInline(admin.StackedInline):
@@ -11,13 +20,41 @@ class RecipeIngredientInline(admin.StackedInline):
 
 class RecipeAdmin(admin.ModelAdmin):
     list_display = ('id', 'author', 'name', 'text', 'cooking_time',
-                    'is_favorited')
+                    'is_favorited', 'in_carts_count')
     list_filter = ('name', 'author', 'tags')
     ordering = ['id']
     inlines = (RecipeIngredientInline,)
 
     def is_favorited(self, obj):
-        return len(Favorite.objects.filter(recipe=obj))
+        return obj.favorites_count
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            return super().save_model(request, obj, form, change)
+        fields = {field.name for field in obj._meta.concrete_fields}
+        obj.save(update_fields=[
+            *(name for name in form.changed_data if name in fields),
+            'updated_at'])
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        refresh_recipes([form.instance.id])
+
+
+class RecipeRelationAdmin(admin.ModelAdmin):
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        refresh_recipes({obj.recipe_id, form.initial.get('recipe')} - {None})
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        refresh_recipes([obj.recipe_id])
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = set(queryset.values_list('recipe_id', flat=True))
+        super().delete_queryset(request, queryset)
+        refresh_recipes(recipe_ids)
 
 
 class IngredientAdmin(admin.ModelAdmin):
@@ -34,8 +71,8 @@ class TagAdmin(admin.ModelAdmin):
 admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(Ingredient, IngredientAdmin)
 admin.site.register(Tag, TagAdmin)
-admin.site.register(RecipeIngredient)
-admin.site.register(RecipeTag)
+admin.site.register(RecipeIngredient, RecipeRelationAdmin)
+admin.site.register(RecipeTag, RecipeRelationAdmin)
 admin.site.register(Follow)
 admin.site.register(Favorite)
 admin.site.register(ShoppingList)
@@ -0,0 +1,70 @@
+from heapq import merge
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Q
+
+BATCH_SIZE = 1000
+
+
+def fan_out_recipe(recipe):
+    from .models import FeedEntry, Follow, Recipe
+
+    limit = settings.FEED_FANOUT_MAX_FOLLOWERS
+    followers = list(Follow.objects.filter(
+        author_id=recipe.author_id).values_list('user_id', flat=True)[
+        :limit + 1])
+    if len(followers) > limit:
+        return False
+    FeedEntry.objects.bulk_create([
+        FeedEntry(user_id=user_id, recipe_id=recipe.id,
+                  author_id=recipe.author_id, pub_date=recipe.pub_date)
+        for user_id in followers
+    ], batch_size=BATCH_SIZE, ignore_conflicts=True)
+    Recipe.objects.filter(id=recipe.id).update(fanned_out=True)
+    recipe.fanned_out = True
+    return True
+
+
+def backfill_feed(user_id, author_id):
+    from .models import FeedEntry, Recipe
+
+    recipes = Recipe.objects.filter(
+        author_id=author_id, fanned_out=True
+    ).order_by('-pub_date', '-id').values_list('id', 'pub_date')[
+        :settings.FEED_BACKFILL_SIZE]
+    FeedEntry.objects.bulk_create([
+        FeedEntry(user_id=user_id, recipe_id=recipe_id, author_id=author_id,
+                  pub_date=pub_date)
+        for recipe_id, pub_date in recipes
+    ], ignore_conflicts=True)
+
+
+def remove_from_feed(user_id, author_id):
+    from .models import FeedEntry
+
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def before_position(queryset, position, id_field):
+    if position is None:
+        return queryset
+    pub_date, pk = position
+    return queryset.filter(pub_date__lte=pub_date).filter(
+        Q(pub_date__lt=pub_date) | Q(**{f'{id_field}__lt': pk}))
+
+
+def get_feed(user, position=None, limit=None):
+    from .models import FeedEntry, Follow, Recipe
+
+    pushed = before_position(
+        FeedEntry.objects.filter(user=user), position, 'recipe_id'
+    ).order_by('-pub_date', '-recipe_id').values_list('pub_date', 'recipe_id')
+    pulled = before_position(
+        Recipe.objects.filter(
+            fanned_out=False,
+            author__in=Follow.objects.filter(user=user).values('author')),
+        position, 'id'
+    ).order_by('-pub_date', '-id').values_list('pub_date', 'id')
+    return list(islice(merge(pushed[:limit], pulled[:limit], reverse=True),
+                       limit))
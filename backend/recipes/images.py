@@ -0,0 +1,93 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+IMAGE_FORMAT = 'WEBP'
+IMAGE_EXTENSION = 'webp'
+IMAGE_QUALITY = 85
+IMAGE_MAX_SIZE = (1920, 1920)
+THUMB_SIZE = (480, 320)
+DETAIL_SIZE = (960, 640)
+
+logger = logging.getLogger(__name__)
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_PROCESSING_WORKERS,
+    thread_name_prefix='recipe-images'
+)
+
+
+def encode_image(image, name):
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    buffer = BytesIO()
+    image.save(buffer, IMAGE_FORMAT, quality=IMAGE_QUALITY, method=4)
+    return ContentFile(buffer.getvalue(), name=f'{name}.{IMAGE_EXTENSION}')
+
+
+def compress_image(image, name):
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail(IMAGE_MAX_SIZE)
+    return encode_image(image, name)
+
+
+def make_thumbnail(image, size, name):
+    return encode_image(ImageOps.fit(image, size), name)
+
+
+def process_recipe_image(recipe_id):
+    from api.cache import bump_cache_version
+    from .models import Recipe
+
+    recipe = Recipe.objects.filter(id=recipe_id, image_ready=False).first()
+    if recipe is None:
+        return
+    raw_name = recipe.image.name
+    name = os.path.splitext(os.path.basename(raw_name))[0]
+    storage = recipe.image.storage
+    with storage.open(raw_name, 'rb') as file, Image.open(file) as image:
+        image.load()
+        files = {
+            'image': compress_image(image, name),
+            'image_thumb': make_thumbnail(image, THUMB_SIZE, f'{name}_thumb'),
+            'image_detail': make_thumbnail(
+                image, DETAIL_SIZE, f'{name}_detail'),
+        }
+    for field, content in files.items():
+        getattr(recipe, field).save(content.name, content, save=False)
+    updated = Recipe.objects.filter(
+        id=recipe_id, image=raw_name, image_ready=False
+    ).update(
+        image=recipe.image.name,
+        image_thumb=recipe.image_thumb.name,
+        image_detail=recipe.image_detail.name,
+        image_ready=True,
+        updated_at=timezone.now()
+    )
+    if updated:
+        storage.delete(raw_name)
+        bump_cache_version(Recipe)
+        return
+    for field in files:
+        storage.delete(getattr(recipe, field).name)
+
+
+def run_image_job(recipe_id):
+    close_old_connections()
+    try:
+        process_recipe_image(recipe_id)
+    except Exception:
+        logger.exception('Не удалось обработать изображение рецепта %s',
+                         recipe_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_image_processing(recipe):
+    transaction.on_commit(lambda: executor.submit(run_image_job, recipe.id))
@@ -0,0 +1,45 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from recipes.feed import BATCH_SIZE
+from recipes.models import FeedEntry, Follow, Recipe
+
+
+class Command(BaseCommand):
+    help = ('Copy recipes that are not fanned out yet to the feeds of '
+            'their authors followers')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        limit = settings.FEED_FANOUT_MAX_FOLLOWERS
+        fanned_out = skipped = entries = 0
+        pending = Recipe.objects.filter(fanned_out=False)
+        author_ids = list(pending.order_by().values_list(
+            'author_id', flat=True).distinct())
+        for author_id in author_ids:
+            with transaction.atomic():
+                recipes = list(pending.filter(author_id=author_id).values_list(
+                    'id', 'pub_date'))
+                followers = list(Follow.objects.filter(
+                    author_id=author_id).values_list('user_id', flat=True)[
+                    :limit + 1])
+                if len(followers) > limit:
+                    skipped += len(recipes)
+                    continue
+                FeedEntry.objects.bulk_create([
+                    FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                              author_id=author_id, pub_date=pub_date)
+                    for recipe_id, pub_date in recipes
+                    for user_id in followers
+                ], batch_size=BATCH_SIZE, ignore_conflicts=True)
+                Recipe.objects.filter(
+                    id__in=[recipe_id for recipe_id, _ in recipes]
+                ).update(fanned_out=True)
+                fanned_out += len(recipes)
+                entries += len(recipes) * len(followers)
+        self.stdout.write(
+            f'Разослано в ленты {fanned_out} рецептов ({entries} записей), '
+            f'оставлено для чтения по подпискам {skipped} '
+            f'за {time.monotonic() - started:.1f} с.')
@@ -1,21 +1,81 @@
 import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from api.cache import bump_cache_version
 from recipes.models import Ingredient
 
+DEFAULT_FILE = 'recipes/management/commands/ingredients.csv'
+BATCH_SIZE = 1000
+
+
+def read_csv(file):
+    with open(file, encoding='utf-8', newline='') as f:
+        for row in csv.reader(f):
+            if len(row) >= 2:
+                yield row[0], row[1]
+
+
+def read_json(file):
+    with open(file, encoding='utf-8') as f:
+        for item in json.load(f):
+            yield item['name'], item['measurement_unit']
+
+
+READERS = {
+    '.csv': read_csv,
+    '.json': read_json,
+}
+
 
 class Command(BaseCommand):
-    help = 'Import data from CSV to db'
+    help = 'Import ingredients from CSV or JSON to db'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=DEFAULT_FILE)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
 
     def handle(self, *args, **options):
-        file = 'recipes/management/commands/ingredients.csv'
-        with open(file, encoding='utf-8') as f:
-            reader = csv.reader(f)
-            total = 0
-            for row in reader:
-                obj, status = Ingredient.objects.get_or_create(
-                    name=row[0], measurement_unit=row[1])
-                if status:
-                    total += 1
-                print(file, ': загружено ', total, ' записей.')
+        file = Path(options['path'])
+        reader = READERS.get(file.suffix.lower())
+        if reader is None:
+            raise CommandError(f'Неподдерживаемый формат файла: {file}')
+        if not file.exists():
+            raise CommandError(f'Файл не найден: {file}')
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('Размер пакета должен быть больше 0!')
+
+        started = time.monotonic()
+        seen = set()
+        total = 0
+        rows = reader(file)
+        with transaction.atomic():
+            before = Ingredient.objects.count()
+            while True:
+                chunk = list(islice(rows, batch_size))
+                if not chunk:
+                    break
+                total += len(chunk)
+                batch = []
+                for name, unit in chunk:
+                    key = (name.strip(), unit.strip())
+                    if key not in seen:
+                        seen.add(key)
+                        batch.append(Ingredient(
+                            name=key[0], measurement_unit=key[1]))
+                Ingredient.objects.bulk_create(
+                    batch, batch_size=batch_size, ignore_conflicts=True)
+            created = Ingredient.objects.count() - before
+        if created:
+            bump_cache_version(Ingredient)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'{file}: прочитано {total} строк, загружено {created} записей '
+            f'за {elapsed:.2f} с ({total / max(elapsed, 1e-6):.0f} строк/с).'
+        )
         return 'Operation complete!'
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from recipes.images import process_recipe_image
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Process recipe images that are still waiting in the queue'
+
+    def handle(self, *args, **options):
+        recipe_ids = list(Recipe.objects.filter(
+            image_ready=False).values_list('id', flat=True))
+        for recipe_id in recipe_ids:
+            process_recipe_image(recipe_id)
+        self.stdout.write(f'Обработано изображений: {len(recipe_ids)}.')
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from recipes.models import Recipe
+from recipes.search import update_search_documents
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Rebuild full-text search documents of all recipes in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        recipe_ids = list(
+            Recipe.objects.order_by('id').values_list('id', flat=True))
+        for start in range(0, len(recipe_ids), batch_size):
+            update_search_documents(recipe_ids[start:start + batch_size])
+        self.stdout.write(
+            f'Обновлены поисковые документы {len(recipe_ids)} рецептов.')
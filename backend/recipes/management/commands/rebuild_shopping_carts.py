@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from api.shopping_cart import rebuild_cart_items
+
+
+class Command(BaseCommand):
+    help = 'Rebuild aggregated shopping cart items of all users'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            created = rebuild_cart_items()
+        self.stdout.write(f'Пересобрано {created} позиций списков покупок.')
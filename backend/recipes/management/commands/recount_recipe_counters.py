@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from recipes.models import Favorite, Recipe, ShoppingList
+
+
+def count_subquery(model):
+    return Coalesce(Subquery(
+        model.objects.filter(recipe=OuterRef('pk')).order_by().values(
+            'recipe').annotate(total=Count('id')).values('total')
+    ), 0)
+
+
+class Command(BaseCommand):
+    help = ('Recompute favorites, shopping cart and ingredients counters '
+            'of recipes')
+
+    def handle(self, *args, **options):
+        updated = Recipe.objects.update(
+            favorites_count=count_subquery(Favorite),
+            in_carts_count=count_subquery(ShoppingList)
+        )
+        Recipe.objects.update_ingredients_count()
+        self.stdout.write(f'Пересчитаны счётчики {updated} рецептов.')
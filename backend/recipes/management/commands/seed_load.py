@@ -0,0 +1,196 @@
+import random
+import time
+from bisect import bisect
+from datetime import timedelta
+from io import StringIO
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from recipes.models import (Favorite, Follow, Ingredient, Recipe,
+                            RecipeIngredient, RecipeTag, ShoppingList, Tag)
+from users.models import User
+
+TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+)
+BATCH_SIZE = 5000
+MAX_INGREDIENTS = 30
+
+
+class ZipfSampler:
+
+    def __init__(self, items, exponent, rng):
+        self.items = items
+        self.rng = rng
+        self.cum_weights = list(accumulate(
+            1 / rank ** exponent for rank in range(1, len(items) + 1)))
+
+    def sample(self):
+        value = self.rng.random() * self.cum_weights[-1]
+        return self.items[bisect(self.cum_weights, value)]
+
+    def sample_unique(self, size):
+        size = min(size, len(self.items))
+        result = set()
+        attempts = 0
+        while len(result) < size and attempts < size * 20:
+            result.add(self.sample())
+            attempts += 1
+        return result
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = ('Generate users, recipes, follows, favorites and shopping '
+            'carts for load testing')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--follows', type=int, default=10,
+                            help='Среднее число подписок пользователя')
+        parser.add_argument('--favorites', type=int, default=20,
+                            help='Среднее число избранных рецептов')
+        parser.add_argument('--cart', type=int, default=5,
+                            help='Среднее число рецептов в списке покупок')
+        parser.add_argument('--zipf', type=float, default=1.1)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--password', default='password')
+
+    def handle(self, *args, **options):
+        if not Ingredient.objects.exists():
+            call_command('import_csv', stdout=StringIO())
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create([
+                Tag(name=name, color=color, slug=slug)
+                for name, color, slug in TAGS
+            ])
+        if options['users'] < 1:
+            raise CommandError('Нужен хотя бы один пользователь!')
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.zipf = options['zipf']
+        started = time.monotonic()
+        with transaction.atomic():
+            user_ids = self.create_users(options)
+            recipe_ids = self.create_recipes(user_ids, options)
+            self.create_relations(user_ids, recipe_ids, options)
+            self.reset_sequences()
+        call_command('recount_recipe_counters', stdout=StringIO())
+        call_command('rebuild_shopping_carts', stdout=StringIO())
+        call_command('rebuild_search_documents', stdout=StringIO())
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started:.1f} с.'))
+
+    def report(self, name, count, started):
+        elapsed = time.monotonic() - started
+        self.stdout.write(f'{name}: {count} записей за {elapsed:.1f} с '
+                          f'({count / max(elapsed, 1e-6):.0f} строк/с).')
+
+    def bulk_create(self, model, objects):
+        count = 0
+        for batch in batched(objects, self.batch_size):
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            count += len(batch)
+        return count
+
+    @staticmethod
+    def next_id(model):
+        return (model.objects.aggregate(max_id=Max('id'))['max_id'] or 0) + 1
+
+    def create_users(self, options):
+        started = time.monotonic()
+        first_id = self.next_id(User)
+        user_ids = list(range(first_id, first_id + options['users']))
+        password = make_password(options['password'])
+        self.bulk_create(User, (
+            User(id=user_id, username=f'load{user_id}',
+                 email=f'load{user_id}@example.com', first_name='Load',
+                 last_name=str(user_id), password=password)
+            for user_id in user_ids
+        ))
+        self.report('Пользователи', len(user_ids), started)
+        return user_ids
+
+    def create_recipes(self, user_ids, options):
+        started = time.monotonic()
+        authors = ZipfSampler(user_ids, self.zipf, self.rng)
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        self.rng.shuffle(ingredient_ids)
+        ingredients = ZipfSampler(ingredient_ids, self.zipf, self.rng)
+        tag_ids = list(Tag.objects.values_list('id', flat=True))
+        now = timezone.now()
+        first_id = self.next_id(Recipe)
+        recipe_ids = list(range(first_id, first_id + options['recipes']))
+        self.bulk_create(Recipe, (
+            Recipe(id=recipe_id, author_id=authors.sample(),
+                   name=f'Рецепт {recipe_id}', text='Описание рецепта',
+                   image='recipes/images/seed.png',
+                   cooking_time=self.rng.randint(5, 180),
+                   pub_date=now - timedelta(
+                       seconds=self.rng.randint(0, 365 * 24 * 3600)))
+            for recipe_id in recipe_ids
+        ))
+        mean = options['ingredients_per_recipe']
+        count = self.bulk_create(RecipeIngredient, (
+            RecipeIngredient(recipe_id=recipe_id, ingredient_id=ingredient_id,
+                             amount=self.rng.randint(1, 500))
+            for recipe_id in recipe_ids
+            for ingredient_id in ingredients.sample_unique(min(max(
+                1, round(self.rng.gauss(mean, mean / 3))), MAX_INGREDIENTS))
+        ))
+        self.bulk_create(RecipeTag, (
+            RecipeTag(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in self.rng.sample(
+                tag_ids, self.rng.randint(1, len(tag_ids)))
+        ))
+        self.report('Рецепты', len(recipe_ids), started)
+        self.report('Ингредиенты рецептов', count, started)
+        return recipe_ids
+
+    def create_relations(self, user_ids, recipe_ids, options):
+        for model, field, targets, mean, name in (
+                (Follow, 'author_id', user_ids, options['follows'],
+                 'Подписки'),
+                (Favorite, 'recipe_id', recipe_ids, options['favorites'],
+                 'Избранное'),
+                (ShoppingList, 'recipe_id', recipe_ids, options['cart'],
+                 'Списки покупок')):
+            if not targets:
+                continue
+            started = time.monotonic()
+            sampler = ZipfSampler(targets, self.zipf, self.rng)
+            count = self.bulk_create(model, (
+                model(user_id=user_id, **{field: target})
+                for user_id in user_ids
+                for target in sampler.sample_unique(
+                    self.rng.randint(0, 2 * mean))
+                if model is not Follow or target != user_id
+            ))
+            self.report(name, count, started)
+
+    @staticmethod
+    def reset_sequences():
+        sql = connection.ops.sequence_reset_sql(no_style(), [User, Recipe])
+        with connection.cursor() as cursor:
+            for statement in sql:
+                cursor.execute(statement)
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-17 06:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0017_recipe_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_ready',
+            field=models.BooleanField(default=True, editable=False, verbose_name='Изображение обработано'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 3.2 on 2026-10-17 06:15
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+POSTGRES_CREATE_INDEX = (
+    'CREATE INDEX IF NOT EXISTS recipes_recipe_search_idx '
+    "ON recipes_recipe USING gin "
+    "(to_tsvector('russian', search_document))"
+)
+POSTGRES_DROP_INDEX = 'DROP INDEX IF EXISTS recipes_recipe_search_idx'
+
+
+def fill_search_documents(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    ingredients = defaultdict(list)
+    for recipe_id, name in RecipeIngredient.objects.order_by(
+            'id').values_list('recipe_id', 'ingredient__name').iterator():
+        ingredients[recipe_id].append(name)
+    recipes = list(Recipe.objects.only('id', 'name', 'text'))
+    for recipe in recipes:
+        recipe.search_document = ' '.join(
+            (recipe.name, *ingredients[recipe.id], recipe.text)).lower()
+    Recipe.objects.bulk_update(recipes, ['search_document'], batch_size=500)
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_CREATE_INDEX)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_DROP_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0018_recipe_image_ready'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_document',
+            field=models.TextField(blank=True, editable=False, verbose_name='Поисковый документ'),
+        ),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_index, drop_index),
+    ]
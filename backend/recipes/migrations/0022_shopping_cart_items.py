@@ -0,0 +1,53 @@
+# Generated by Django 3.2 on 2026-10-17 07:41
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+import django.db.models.deletion
+
+
+def fill_cart_items(apps, schema_editor):
+    ShoppingList = apps.get_model('recipes', 'ShoppingList')
+    ShoppingCartItem = apps.get_model('recipes', 'ShoppingCartItem')
+    rows = ShoppingList.objects.filter(
+        recipe__amounts__isnull=False
+    ).values('user_id', 'recipe__amounts__ingredient_id').annotate(
+        total=Sum('recipe__amounts__amount'), recipes=Count('recipe')
+    ).order_by()
+    ShoppingCartItem.objects.bulk_create([
+        ShoppingCartItem(
+            user_id=row['user_id'],
+            ingredient_id=row['recipe__amounts__ingredient_id'],
+            total_amount=row['total'], recipes_count=row['recipes'])
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0021_feed_entries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingCartItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_amount', models.PositiveIntegerField(verbose_name='Количество')),
+                ('recipes_count', models.PositiveIntegerField(verbose_name='Число рецептов')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_items', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Позиция списка покупок',
+                'verbose_name_plural': 'Позиции списков покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcartitem',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique shopping cart item'),
+        ),
+        migrations.RunPython(fill_cart_items, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.utils import timezone
 from django.db import models
+from django.db.models.functions import Cast, Coalesce, NullIf
 from django.core.validators import MinValueValidator, MaxValueValidator
 from users.models import User
 
@@ -38,6 +39,63 @@ class Tag(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+
+    def with_user_flags(self, user):
+        if user.is_anonymous:
+            return self.annotate(
+                is_favorited=models.Value(
+                    False, output_field=models.BooleanField()),
+                is_in_shopping_cart=models.Value(
+                    False, output_field=models.BooleanField())
+            )
+        return self.annotate(
+            is_favorited=models.Exists(Favorite.objects.filter(
+                user=user, recipe=models.OuterRef('pk'))),
+            is_in_shopping_cart=models.Exists(ShoppingList.objects.filter(
+                user=user, recipe=models.OuterRef('pk')))
+        )
+
+    def with_pantry_coverage(self, ingredient_ids):
+        return self.filter(
+            amounts__ingredient__in=ingredient_ids
+        ).annotate(
+            ingredients_matched=models.Count('amounts')
+        ).annotate(
+            missing_count=(models.F('ingredients_count')
+                           - models.F('ingredients_matched')),
+            coverage=models.ExpressionWrapper(
+                Cast('ingredients_matched', models.FloatField())
+                / NullIf('ingredients_count', models.Value(0)),
+                output_field=models.FloatField()),
+        ).order_by('-coverage', 'missing_count', '-pub_date', '-id')
+
+    def update_ingredients_count(self):
+        return self.update(ingredients_count=Coalesce(models.Subquery(
+            RecipeIngredient.objects.filter(
+                recipe=models.OuterRef('pk')).order_by().values(
+                'recipe').annotate(total=models.Count('id')).values('total')
+        ), 0))
+
+    def with_related(self, user):
+        if user.is_anonymous:
+            authors = User.objects.annotate(is_subscribed=models.Value(
+                False, output_field=models.BooleanField()))
+        else:
+            authors = User.objects.annotate(is_subscribed=models.Exists(
+                Follow.objects.filter(
+                    user=user, author=models.OuterRef('pk'))))
+        return self.prefetch_related(
+            'tags',
+            models.Prefetch('author', queryset=authors),
+            models.Prefetch(
+                'amounts',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient')
+            )
+        )
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         User,
@@ -47,6 +105,12 @@ class Recipe(models.Model):
     )
     name = models.CharField('Название', max_length=200)
     image = models.ImageField(upload_to='recipes/images/')
+    image_thumb = models.ImageField(
+        upload_to='recipes/thumbs/', blank=True, editable=False)
+    image_detail = models.ImageField(
+        upload_to='recipes/thumbs/', blank=True, editable=False)
+    image_ready = models.BooleanField(
+        'Изображение обработано', default=True, editable=False)
     text = models.TextField('Описание')
     ingredients = models.ManyToManyField(
         Ingredient,
@@ -66,13 +130,37 @@ class Recipe(models.Model):
     )
     pub_date = models.DateTimeField(
         'Дата публикации', default=timezone.now)
+    favorites_count = models.PositiveIntegerField(
+        'В избранном', default=0, editable=False)
+    in_carts_count = models.PositiveIntegerField(
+        'В списках покупок', default=0, editable=False)
+    ingredients_count = models.PositiveSmallIntegerField(
+        'Число ингредиентов', default=0, editable=False)
+    search_document = models.TextField(
+        'Поисковый документ', blank=True, editable=False)
+    fanned_out = models.BooleanField(
+        'Разослан в ленты', default=False, editable=False)
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         constraints = [models.UniqueConstraint(
             fields=['author', 'name'], name='unique recipe')]
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='recipe_pub_date_id_idx'),
+            models.Index(
+                fields=['-favorites_count', '-pub_date', '-id'],
+                name='recipe_popular_idx'),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='recipe_feed_pull_idx',
+                condition=models.Q(fanned_out=False))
+        ]
 
     def __str__(self):
         return self.name
@@ -105,6 +193,12 @@ class RecipeIngredient(models.Model):
         verbose_name = 'Рецепт-Ингредиент'
         verbose_name_plural = 'Рецепт-Ингредиент'
         ordering = ['-id']
+        indexes = [
+            models.Index(fields=['recipe', 'ingredient'],
+                         name='recipeingredient_recipe_idx'),
+            models.Index(fields=['ingredient', 'recipe'],
+                         name='recipeingredient_ingr_idx'),
+        ]
 
     def __str__(self):
         return f'{self.recipe} - {self.ingredient}'
@@ -128,6 +222,8 @@ class RecipeTag(models.Model):
         verbose_name = 'Рецепт-Тег'
         verbose_name_plural = 'Рецепт-Тег'
         ordering = ['-id']
+        indexes = [models.Index(
+            fields=['tag', 'recipe'], name='recipetag_tag_recipe_idx')]
 
     def __str__(self):
         return f'{self.recipe} - {self.tag}'
@@ -206,3 +302,66 @@ class ShoppingList(models.Model):
 
     def __str__(self):
         return f'{self.user} - {self.recipe}'
+
+
+class ShoppingCartItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        related_name='cart_items'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент',
+        related_name='+'
+    )
+    total_amount = models.PositiveIntegerField('Количество')
+    recipes_count = models.PositiveIntegerField('Число рецептов')
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Позиции списков покупок'
+        constraints = [models.UniqueConstraint(
+            fields=['user', 'ingredient'], name='unique shopping cart item')]
+
+    def __str__(self):
+        return f'{self.user} - {self.ingredient}'
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Подписчик',
+        related_name='feed_entries'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт',
+        related_name='feed_entries'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Автор',
+        related_name='+'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Ленты подписок'
+        constraints = [models.UniqueConstraint(
+            fields=['user', 'recipe'], name='unique feed entry')]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-recipe'],
+                         name='feedentry_user_pub_date_idx'),
+            models.Index(fields=['user', 'author'],
+                         name='feedentry_user_author_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user} - {self.recipe}'
@@ -0,0 +1,56 @@
+from collections import defaultdict
+from functools import reduce
+from operator import add
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import StrIndex
+
+SEARCH_CONFIG = 'russian'
+
+
+def build_search_document(name, ingredients, text):
+    return ' '.join((name, *ingredients, text)).lower()
+
+
+def update_search_documents(recipe_ids):
+    from .models import Recipe, RecipeIngredient
+
+    recipes = list(Recipe.objects.filter(id__in=set(recipe_ids)).only(
+        'id', 'name', 'text', 'search_document'))
+    ingredients = defaultdict(list)
+    for recipe_id, name in RecipeIngredient.objects.filter(
+            recipe__in=recipes).order_by('id').values_list(
+            'recipe_id', 'ingredient__name'):
+        ingredients[recipe_id].append(name)
+    changed = []
+    for recipe in recipes:
+        document = build_search_document(
+            recipe.name, ingredients[recipe.id], recipe.text)
+        if recipe.search_document != document:
+            recipe.search_document = document
+            changed.append(recipe)
+    Recipe.objects.bulk_update(changed, ['search_document'], batch_size=500)
+
+
+def search_recipes(queryset, query):
+    if connection.vendor == 'postgresql':
+        document = (f"to_tsvector('{SEARCH_CONFIG}', "
+                    f"recipes_recipe.search_document)")
+        tsquery = f"plainto_tsquery('{SEARCH_CONFIG}', %s)"
+        return queryset.annotate(
+            search_match=RawSQL(f'{document} @@ {tsquery}', (query,),
+                                output_field=BooleanField()),
+            search_rank=RawSQL(f'ts_rank({document}, {tsquery})', (query,),
+                               output_field=FloatField())
+        ).filter(search_match=True).order_by('-search_rank', '-pub_date',
+                                             '-id')
+    terms = query.lower().split()
+    if not terms:
+        return queryset
+    for term in terms:
+        queryset = queryset.filter(search_document__contains=term)
+    return queryset.annotate(search_rank=reduce(add, (
+        StrIndex('search_document', Value(term)) for term in terms
+    ))).order_by('search_rank', '-pub_date', '-id')